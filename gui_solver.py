@@ -2,46 +2,72 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
 import threading
+import queue
 import sys
 import os
 
 # Импортируем логику из вашего решателя
 from solver import (
-    neighbors_orth,
-    count_connected_components,
     validate_grid,
     HitoriSolver,
-    display_grid as cli_display_grid
+    read_puzzle,
+    solution_stats,
 )
 
 
-class HitoriCell(tk.Canvas):
-    """Виджет для отображения одной клетки Hitori"""
+class HitoriBoard(tk.Canvas):
+    """Виджет для отображения всей сетки Hitori на одном Canvas"""
 
-    def __init__(self, parent, value, state=0, **kwargs):
-        size = 50
-        super().__init__(parent, width=size, height=size,
-                         relief=tk.RAISED, bd=2, **kwargs)
-        self.value = value
-        self.state = state  # 0 - белая, 1 - черная
-        self.size = size
-        self.draw()
+    CELL_SIZE = 50
 
-    def draw(self):
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, width=0, height=0, highlightthickness=0, **kwargs)
+        self.shape = None
+        self.rect_ids = []
+        self.text_ids = []
+
+    def build(self, H: int, W: int):
+        """Создание элементов клеток (только при смене размера сетки)"""
         self.delete("all")
+        size = self.CELL_SIZE
+        self.config(width=W * size + 1, height=H * size + 1)
+        self.rect_ids = []
+        self.text_ids = []
+        for r in range(H):
+            rect_row = []
+            text_row = []
+            for c in range(W):
+                x, y = c * size, r * size
+                rect_row.append(self.create_rectangle(x + 1, y + 1, x + size, y + size,
+                                                      outline='gray'))
+                text_row.append(self.create_text(x + size // 2, y + size // 2,
+                                                 font=('Arial', 14, 'bold')))
+            self.rect_ids.append(rect_row)
+            self.text_ids.append(text_row)
+        self.shape = (H, W)
+
+    def draw(self, grid, state=None):
+        """Перекраска клеток без пересоздания элементов"""
+        H = len(grid)
+        W = len(grid[0])
+        if self.shape != (H, W):
+            self.build(H, W)
 
-        if self.state == 0:  # Белая клетка
-            self.config(bg='white')
-            self.create_text(self.size // 2, self.size // 2,
-                             text=str(self.value),
-                             font=('Arial', 14, 'bold'))
-        else:  # Черная клетка
-            self.config(bg='black')
-            # Белый текст на черном фоне
-            self.create_text(self.size // 2, self.size // 2,
-                             text=str(self.value),
-                             font=('Arial', 14, 'bold'),
-                             fill='white')
+        for r in range(H):
+            for c in range(W):
+                black = bool(state) and state[r][c] == 1
+                self.itemconfig(self.rect_ids[r][c], fill='black' if black else 'white')
+                # Белый текст на черном фоне
+                self.itemconfig(self.text_ids[r][c], text=str(grid[r][c]),
+                                fill='white' if black else 'black')
+
+    def clear(self):
+        """Удаление всех клеток"""
+        self.delete("all")
+        self.config(width=0, height=0)
+        self.shape = None
+        self.rect_ids = []
+        self.text_ids = []
 
 
 class HitoriGUI:
@@ -52,11 +78,17 @@ class HitoriGUI:
 
         # Переменные
         self.grid = []
+        self.grid_shape = (0, 0)
+        self.grid_check = None  # результат validate_grid для загруженной сетки
         self.solutions = []
+        self.sol_stats = {}  # индекс решения -> (белые, черные, компоненты)
         self.current_solution = 0
+        self.progress_max = 100  # максимум шкалы прогресса текущего запуска
         self.solver = None
         self.solving = False
-        self.stop_solving = False
+        self.stop_event = None  # флаг остановки текущего запуска
+        self.log_queue = queue.Queue()
+        self.log_flush_pending = False
 
         # Настройка стилей
         self.setup_styles()
@@ -107,6 +139,9 @@ class HitoriGUI:
                                    command=self.next_solution, state='disabled')
         self.btn_next.pack(side=tk.LEFT, padx=5)
 
+        ttk.Button(control_frame, text="Стоп",
+                   command=self.request_stop).pack(side=tk.LEFT, padx=5)
+
         ttk.Button(control_frame, text="Очистить",
                    command=self.clear_all).pack(side=tk.LEFT, padx=5)
 
@@ -128,9 +163,9 @@ class HitoriGUI:
         grid_frame = ttk.LabelFrame(main_frame, text="Сетка Hitori", padding="10")
         grid_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
 
-        # Контейнер для клеток
-        self.grid_container = tk.Frame(grid_frame)
-        self.grid_container.pack()
+        # Холст для клеток
+        self.board_canvas = HitoriBoard(grid_frame)
+        self.board_canvas.pack()
 
         # Информационная панель
         info_frame = ttk.LabelFrame(main_frame, text="Информация", padding="10")
@@ -147,7 +182,7 @@ class HitoriGUI:
                                sticky=(tk.W, tk.E, tk.S), pady=(10, 0))
 
         # Прогресс бар
-        self.progress = ttk.Progressbar(self.status_frame, mode='indeterminate')
+        self.progress = ttk.Progressbar(self.status_frame, mode='determinate')
         self.progress.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10))
 
         # Статус
@@ -156,15 +191,29 @@ class HitoriGUI:
         self.status_label.pack(side=tk.RIGHT)
 
     def log(self, message: str):
-        """Добавление сообщения в информационное окно"""
-        self.info_text.insert(tk.END, message + "\n")
-        self.info_text.see(tk.END)
-        self.root.update_idletasks()
+        """Добавление сообщения в информационное окно (из любого потока)"""
+        self.log_queue.put(message)
+        # Из рабочего потока Tk трогать нельзя - очередь разберет check_solving_complete
+        if threading.current_thread() is threading.main_thread() and not self.log_flush_pending:
+            self.log_flush_pending = True
+            self.root.after_idle(self.flush_log)
+
+    def flush_log(self):
+        """Вывод накопленных сообщений одной вставкой"""
+        self.log_flush_pending = False
+        batch = []
+        while True:
+            try:
+                batch.append(self.log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self.info_text.insert(tk.END, "\n".join(batch) + "\n")
+            self.info_text.see(tk.END)
 
     def set_status(self, message: str):
         """Установка статуса"""
         self.status_label.config(text=message)
-        self.root.update_idletasks()
 
     def load_file(self):
         """Загрузка файла с головоломкой"""
@@ -177,71 +226,43 @@ class HitoriGUI:
             return
 
         try:
-            with open(filename, 'r') as f:
-                grid = []
-                file_M = None
-
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    if line.startswith('# M='):
-                        try:
-                            file_M = int(line.split('=')[1])
-                        except:
-                            pass
-                    elif line and not line.startswith('#'):
-                        try:
-                            row = list(map(int, line.split()))
-                            grid.append(row)
-                        except ValueError as e:
-                            messagebox.showerror("Ошибка",
-                                                 f"Ошибка в строке {line_num}: {e}")
-                            return
-
-                # Валидация
-                is_valid, message = validate_grid(grid)
-                if not is_valid:
-                    messagebox.showerror("Ошибка", message)
-                    return
-
-                self.grid = grid
-
-                if file_M is not None:
-                    self.m_var.set(str(file_M))
-                    self.log(f"Загружено M={file_M} из файла")
-
-                self.display_grid()
-                self.log(f"Загружен файл: {filename}")
-                self.log(f"Размер сетки: {len(grid)}x{len(grid[0])}")
-                self.solutions = []
-                self.current_solution = 0
-                self.update_navigation_buttons()
-
+            grid, file_M = read_puzzle(filename)
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
         except Exception as e:
             messagebox.showerror("Ошибка", f"Ошибка при загрузке файла: {e}")
+            return
+
+        # Валидация
+        is_valid, message = validate_grid(grid)
+        if not is_valid:
+            messagebox.showerror("Ошибка", message)
+            return
+
+        self.grid = grid
+        self.grid_shape = (len(grid), len(grid[0]))
+        self.grid_check = (is_valid, message)
+
+        if file_M is not None:
+            self.m_var.set(str(file_M))
+            self.log(f"Загружено M={file_M} из файла")
+
+        self.display_grid()
+        self.log(f"Загружен файл: {filename}")
+        self.log(f"Размер сетки: {self.grid_shape[0]}x{self.grid_shape[1]}")
+        self.solutions = []
+        self.sol_stats = {}
+        self.current_solution = 0
+        self.update_navigation_buttons()
 
     def display_grid(self, state=None):
         """Отображение сетки"""
-        # Очистка предыдущей сетки
-        for widget in self.grid_container.winfo_children():
-            widget.destroy()
-
         if not self.grid:
+            self.board_canvas.clear()
             return
 
-        H = len(self.grid)
-        W = len(self.grid[0])
-
-        # Создание новой сетки
-        for r in range(H):
-            row_frame = tk.Frame(self.grid_container)
-            row_frame.pack()
-            for c in range(W):
-                cell_state = 0
-                if state:
-                    cell_state = state[r][c] if state[r][c] is not None else 0
-
-                cell = HitoriCell(row_frame, self.grid[r][c], cell_state)
-                cell.pack(side=tk.LEFT)
+        self.board_canvas.draw(self.grid, state)
 
     def validate_grid(self):
         """Проверка корректности сетки"""
@@ -249,7 +270,9 @@ class HitoriGUI:
             messagebox.showwarning("Предупреждение", "Сетка не загружена")
             return
 
-        is_valid, message = validate_grid(self.grid)
+        if self.grid_check is None:
+            self.grid_check = validate_grid(self.grid)
+        is_valid, message = self.grid_check
         if is_valid:
             messagebox.showinfo("Проверка", "Сетка корректна!")
             self.log("✓ Сетка прошла проверку")
@@ -271,6 +294,10 @@ class HitoriGUI:
 
     def solve_puzzle(self, need: int = None):
         """Запуск решения головоломки"""
+        if self.solving:
+            messagebox.showwarning("Предупреждение", "Поиск уже выполняется")
+            return
+
         if not self.grid:
             messagebox.showwarning("Предупреждение", "Сетка не загружена")
             return
@@ -294,47 +321,82 @@ class HitoriGUI:
 
         # Сброс предыдущих решений
         self.solutions = []
+        self.sol_stats = {}
         self.current_solution = 0
 
         # Запуск в отдельном потоке, чтобы не блокировать GUI
-        self.stop_solving = False
+        self.stop_event = threading.Event()
         self.solving = True
-        self.progress.start()
+        # У каждого запуска своя очередь и событие: поток прошлого поиска
+        # не может подмешать решения или завершить новый
+        sol_queue = queue.Queue()
+        done_event = threading.Event()
+        # Прогресс - число найденных решений (для "все решения" шкала условная)
+        self.progress_max = need if need else 100
+        self.progress.config(maximum=self.progress_max, value=0)
         self.set_status("Решение...")
         self.log(f"\nНачинаю решение... (M={M}, N={need})")
 
         thread = threading.Thread(
             target=self.solve_thread,
-            args=(need, M),
+            args=(need, M, sol_queue, done_event, self.stop_event),
             daemon=True
         )
         thread.start()
 
         # Периодическая проверка завершения
-        self.check_solving_complete()
+        self.check_solving_complete(sol_queue, done_event, self.stop_event)
 
-    def solve_thread(self, need: int, M: int):
-        """Поток для решения головоломки"""
+    def solve_thread(self, need: int, M: int, sol_queue: queue.Queue,
+                     done_event: threading.Event, stop_event: threading.Event):
+        """Поток для решения головоломки: решения передаются по одному"""
         try:
             solver = HitoriSolver(self.grid, max_components=M)
-            self.solutions = solver.solve(need)
+            for solution in solver.solve_iter(need, should_stop=stop_event.is_set):
+                sol_queue.put_nowait(solution)
         except Exception as e:
-            self.solutions = []
             self.log(f"Ошибка при решении: {e}")
+        finally:
+            done_event.set()
 
-    def check_solving_complete(self):
-        """Проверка завершения решения"""
+    def request_stop(self):
+        """Запрос остановки текущего поиска"""
         if self.solving:
-            if self.solutions or not threading.active_count() > 1:
+            self.stop_event.set()
+            self.set_status("Остановка...")
+
+    def check_solving_complete(self, sol_queue: queue.Queue, done_event: threading.Event,
+                               stop_event: threading.Event):
+        """Проверка хода решения"""
+        self.flush_log()
+        if self.solving:
+            # Событие проверяется до разбора очереди, чтобы не потерять последние решения
+            finished = done_event.is_set()
+            found_before = len(self.solutions)
+            while True:
+                try:
+                    self.solutions.append(sol_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if len(self.solutions) > found_before:
+                if found_before == 0:
+                    self.display_solution(0)
+                self.progress['value'] = min(len(self.solutions), self.progress_max)
+                self.set_status(f"Решение... найдено: {len(self.solutions)}")
+                self.update_navigation_buttons()
+
+            if finished:
                 # Решение завершено
                 self.solving = False
-                self.stop_solving = False
-                self.progress.stop()
 
-                if self.solutions:
+                if stop_event.is_set():
+                    # Остановленный поиск ничего не доказывает об отсутствии решений
+                    self.set_status(f"Поиск остановлен, найдено решений: {len(self.solutions)}")
+                    self.log(f"■ Поиск остановлен, найдено {len(self.solutions)} решений")
+                elif self.solutions:
                     self.set_status(f"Найдено решений: {len(self.solutions)}")
                     self.log(f"✓ Найдено {len(self.solutions)} решений")
-                    self.display_solution(0)
                 else:
                     self.set_status("Решений нет")
                     self.log("✗ Решений не найдено")
@@ -343,7 +405,7 @@ class HitoriGUI:
                 self.update_navigation_buttons()
             else:
                 # Продолжаем ждать
-                self.root.after(100, self.check_solving_complete)
+                self.root.after(20, self.check_solving_complete, sol_queue, done_event, stop_event)
 
     def display_solution(self, index: int):
         """Отображение конкретного решения"""
@@ -356,22 +418,10 @@ class HitoriGUI:
         # Отображение сетки с решением
         self.display_grid(solution)
 
-        # Вычисление статистики
-        H = len(self.grid)
-        W = len(self.grid[0])
-        white_count = sum(1 for r in range(H) for c in range(W)
-                          if solution[r][c] == 0)
-        black_count = sum(1 for r in range(H) for c in range(W)
-                          if solution[r][c] == 1)
-
-        # Создание карты белых клеток для подсчета компонент
-        white_map = [[1] * W for _ in range(H)]
-        for r in range(H):
-            for c in range(W):
-                if solution[r][c] == 0:
-                    white_map[r][c] = 0
-
-        components = count_connected_components(white_map)
+        # Вычисление статистики (один раз на решение)
+        if index not in self.sol_stats:
+            self.sol_stats[index] = solution_stats(solution)
+        white_count, black_count, components = self.sol_stats[index]
         M = int(self.m_var.get())
 
         # Логирование информации
@@ -415,14 +465,18 @@ class HitoriGUI:
     def clear_all(self):
         """Очистка всего"""
         self.grid = []
+        self.grid_shape = (0, 0)
+        self.grid_check = None
         self.solutions = []
+        self.sol_stats = {}
         self.current_solution = 0
 
         # Очистка отображения
-        for widget in self.grid_container.winfo_children():
-            widget.destroy()
+        self.board_canvas.clear()
 
+        self.flush_log()
         self.info_text.delete(1.0, tk.END)
+        self.progress.config(value=0)
         self.set_status("Готов")
         self.update_navigation_buttons()
         self.log("Очищено")
@@ -1,18 +1,30 @@
 #!/usr/bin/env python3
 import argparse
-from copy import deepcopy
-from typing import List, Tuple, Optional
-from collections import deque
+import itertools
+import multiprocessing
+from typing import Callable, Iterator, List, Tuple, Optional
 
 __all__ = [
     'neighbors_orth',
     'count_connected_components',
     'validate_grid',
     'HitoriSolver',
+    'read_puzzle',
+    'solution_stats',
     'display_grid'
 ]
 
 
+# Домен клетки - битовая маска допустимых цветов: бит 0 - белая, бит 1 - черная
+DOMAIN_WHITE = 1 << 0
+DOMAIN_BLACK = 1 << 1
+DOMAIN_SIZE = (0, 1, 1, 2)
+
+# Значения клеток в state и во внутреннем плоском состоянии
+WHITE = 0
+BLACK = 1
+UNASSIGNED = 2
+
 
 def neighbors_orth(H: int, W: int, r: int, c: int):
     for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
@@ -24,22 +36,35 @@ def neighbors_orth(H: int, W: int, r: int, c: int):
 def count_connected_components(grid: List[List[int]]) -> int:
     H = len(grid)
     W = len(grid[0])
-    visited = [[False] * W for _ in range(H)]
+    parent = list(range(H * W))
+
+    def find(i: int) -> int:
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    # Один проход в порядке строк: каждая белая клетка - новая компонента,
+    # каждое успешное объединение с верхним/левым белым соседом убирает одну
     components = 0
-
     for r in range(H):
+        row = grid[r]
+        up = grid[r - 1] if r > 0 else None
         for c in range(W):
-            if grid[r][c] == 0 and not visited[r][c]:
-                components += 1
-                queue = deque([(r, c)])
-                visited[r][c] = True
-
-                while queue:
-                    cr, cc = queue.popleft()
-                    for nr, nc in neighbors_orth(H, W, cr, cc):
-                        if grid[nr][nc] == 0 and not visited[nr][nc]:
-                            visited[nr][nc] = True
-                            queue.append((nr, nc))
+            if row[c] != 0:
+                continue
+            i = r * W + c
+            components += 1
+            if c > 0 and row[c - 1] == 0:
+                parent[i] = find(i - 1)
+                components -= 1
+            if up is not None and up[c] == 0:
+                a, b = find(i), find(i - W)
+                if a != b:
+                    parent[a] = b
+                    components -= 1
     return components
 
 
@@ -73,96 +98,472 @@ class HitoriSolver:
         self.H = len(grid)
         self.W = len(grid[0])
         self.grid = grid
-        self.state = deepcopy(state) if state else [[None] * self.W for _ in range(self.H)]
+        self.state = [row[:] for row in state] if state else [[None] * self.W for _ in range(self.H)]
         self.max_components = max_components
         self.solutions: List[List[List[Optional[int]]]] = []
+        self.stats = {'nodes': 0, 'forced': 0}
+
+        H, W = self.H, self.W
+        row_value_masks: List[dict] = [{} for _ in range(H)]
+        col_value_masks: List[dict] = [{} for _ in range(W)]
+        for r in range(H):
+            for c in range(W):
+                v = grid[r][c]
+                row_value_masks[r][v] = row_value_masks[r].get(v, 0) | (1 << c)
+                col_value_masks[c][v] = col_value_masks[c].get(v, 0) | (1 << r)
+
+        # Позиции повторяющихся значений: row_dups[r][v] - столбцы, col_dups[c][v] - строки
+        self._row_dups: List[dict] = [{} for _ in range(H)]
+        self._col_dups: List[dict] = [{} for _ in range(W)]
+        for r in range(H):
+            for c in range(W):
+                v = grid[r][c]
+                if row_value_masks[r][v] & ~(1 << c):
+                    self._row_dups[r].setdefault(v, []).append(c)
+                if col_value_masks[c][v] & ~(1 << r):
+                    self._col_dups[c].setdefault(v, []).append(r)
+
+        # Плоское представление для поиска: клетка (r, c) -> индекс r * W + c
+        self._rc = [divmod(i, W) for i in range(H * W)]
+        self._values = [v for row in grid for v in row]
+        self._cells = bytearray(UNASSIGNED if v is None else v for row in self.state for v in row)
+        self._row_same = [row_value_masks[r][grid[r][c]] for r, c in self._rc]
+        self._col_same = [col_value_masks[c][grid[r][c]] for r, c in self._rc]
+        self._degree = [bin(self._row_same[i]).count('1') + bin(self._col_same[i]).count('1')
+                        for i in range(H * W)]
+        self._nbrs = [[nr * W + nc for nr, nc in neighbors_orth(H, W, r, c)] for r, c in self._rc]
+
+        # Пары соседних по кругу ортогональных клеток и диагональ между ними:
+        # (a, d, b) - a и b связаны напрямую, если d не черная
+        self._ring = []
+        ring = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+        for r, c in self._rc:
+            pairs = []
+            for k in range(0, 8, 2):
+                (ar, ac), (dr, dc), (br, bc) = (
+                    (r + ring[k][0], c + ring[k][1]),
+                    (r + ring[k + 1][0], c + ring[k + 1][1]),
+                    (r + ring[(k + 2) % 8][0], c + ring[(k + 2) % 8][1]))
+                if 0 <= ar < H and 0 <= ac < W and 0 <= br < H and 0 <= bc < W:
+                    pairs.append((ar * W + ac, dr * W + dc, br * W + bc))
+            self._ring.append(pairs)
+
+        self._seen = [0] * (H * W)
+        self._flood_id = 0
+
+        self.empties = [i for i in range(H * W) if self._cells[i] == UNASSIGNED]
+
+        self._black_rows = [0] * H
+        self._black_cols = [0] * W
+        self._white_rows = [0] * H
+        self._white_cols = [0] * W
+        # Заранее заданные клетки, нарушающие правила, делают головоломку нерешаемой
+        self._prefill_ok = True
+        for i in range(H * W):
+            val = self._cells[i]
+            if val != UNASSIGNED:
+                if not (self._can_be_black(i) if val == BLACK else self._can_be_white(i)):
+                    self._prefill_ok = False
+                self._mark(i, val)
+
+    def _mark(self, i: int, val: int):
+        r, c = self._rc[i]
+        if val == BLACK:
+            self._black_rows[r] ^= 1 << c
+            self._black_cols[c] ^= 1 << r
+        else:
+            self._white_rows[r] ^= 1 << c
+            self._white_cols[c] ^= 1 << r
+
+    def _can_be_black(self, i: int) -> bool:
+        r, c = self._rc[i]
+        cbit = 1 << c
+        rbit = 1 << r
+        if self._black_rows[r] & ((cbit << 1) | (cbit >> 1)):
+            return False
+        if self._black_cols[c] & ((rbit << 1) | (rbit >> 1)):
+            return False
+        return True
+
+    def _domain(self, i: int) -> int:
+        # Обе проверки _can_be_white/_can_be_black развернуты в одну функцию:
+        # вызывается для каждой свободной клетки в каждом узле поиска
+        r, c = self._rc[i]
+        dom = 0
+        if not (self._white_rows[r] & self._row_same[i] or self._white_cols[c] & self._col_same[i]):
+            dom = DOMAIN_WHITE
+        cbit = 1 << c
+        rbit = 1 << r
+        if not (self._black_rows[r] & ((cbit << 1) | (cbit >> 1))
+                or self._black_cols[c] & ((rbit << 1) | (rbit >> 1))):
+            dom |= DOMAIN_BLACK
+        return dom
+
+    def _can_be_white(self, i: int) -> bool:
+        r, c = self._rc[i]
+        if self._white_rows[r] & self._row_same[i]:
+            return False
+        if self._white_cols[c] & self._col_same[i]:
+            return False
+        return True
+
+    def _has_black_neighbor(self, r: int, c: int) -> bool:
+        state = self.state
+        if r > 0 and state[r - 1][c] == BLACK:
+            return True
+        if r < self.H - 1 and state[r + 1][c] == BLACK:
+            return True
+        if c > 0 and state[r][c - 1] == BLACK:
+            return True
+        if c < self.W - 1 and state[r][c + 1] == BLACK:
+            return True
+        return False
 
     def allowed(self, r: int, c: int) -> List[int]:
-        options = [0]
-        can_be_black = True
-        for nr, nc in neighbors_orth(self.H, self.W, r, c):
-            if self.state[nr][nc] == 1:
-                can_be_black = False
-                break
-        if can_be_black:
-            options.append(1)
-        return options
+        if self._has_black_neighbor(r, c):
+            return [WHITE]
+        return [WHITE, BLACK]
 
     def find_empty(self) -> Optional[Tuple[int, int]]:
-        for r in range(self.H):
-            for c in range(self.W):
-                if self.state[r][c] is None:
-                    return r, c
+        for r, row in enumerate(self.state):
+            if None in row:
+                return r, row.index(None)
         return None
 
     def valid_partial(self, r: int, c: int) -> bool:
-        H, W = self.H, self.W
         val = self.state[r][c]
 
-        if val == 1:
-            for nr, nc in neighbors_orth(H, W, r, c):
-                if self.state[nr][nc] == 1:
-                    return False
+        if val == BLACK:
+            if self._has_black_neighbor(r, c):
+                return False
         else:
-            row_vals = set()
-            for col in range(W):
-                if self.state[r][col] == 0:
-                    v = self.grid[r][col]
-                    if v in row_vals:
-                        return False
-                    row_vals.add(v)
-
-            col_vals = set()
-            for row in range(H):
-                if self.state[row][c] == 0:
-                    v = self.grid[row][c]
-                    if v in col_vals:
-                        return False
-                    col_vals.add(v)
+            # Состояние могло быть изменено извне, поэтому проверяются все повторяющиеся
+            # значения строки и столбца, а не только значение клетки (r, c)
+            state_row = self.state[r]
+            for cols in self._row_dups[r].values():
+                if sum(state_row[col] == WHITE for col in cols) > 1:
+                    return False
+            for rows in self._col_dups[c].values():
+                if sum(self.state[row][c] == WHITE for row in rows) > 1:
+                    return False
         return True
 
     def check_components(self) -> bool:
-        binary_grid = [[1] * self.W for _ in range(self.H)]
-        for r in range(self.H):
-            for c in range(self.W):
-                if self.state[r][c] == 0 or self.state[r][c] is None:
-                    binary_grid[r][c] = 0
-
+        binary_grid = [[1 if v == BLACK else 0 for v in row] for row in self.state]
         return count_connected_components(binary_grid) <= self.max_components
 
-    def valid_full(self) -> bool:
+    def _split_pieces(self, i: int) -> int:
+        cells = self._cells
+        nbrs = self._nbrs
+        targets = [j for j in nbrs[i] if cells[j] != BLACK]
+
+        # Быстрая локальная проверка: если все белые соседи связаны через
+        # незакрашенные диагонали вокруг клетки, компонента не распадается
+        local = len(targets)
+        for a, d, b in self._ring[i]:
+            if cells[a] != BLACK and cells[b] != BLACK and cells[d] != BLACK:
+                local -= 1
+        if local <= 1:
+            return 1 if targets else 0
+
+        # Метки посещения переиспользуются между вызовами: новый номер обхода
+        # вместо очистки буфера
+        self._flood_id += 1
+        flood_id = self._flood_id
+        seen = self._seen
+        left = len(targets)
+        for j in targets:
+            seen[j] = -flood_id
+        pieces = 0
+        # Обходим только компоненту вокруг клетки i и останавливаемся,
+        # как только все ее соседи оказались связаны
+        for start in targets:
+            if seen[start] == flood_id:
+                continue
+            pieces += 1
+            seen[start] = flood_id
+            left -= 1
+            stack = [start]
+            while stack and left:
+                for j in nbrs[stack.pop()]:
+                    mark = seen[j]
+                    if mark != flood_id and cells[j] != BLACK:
+                        if mark == -flood_id:
+                            left -= 1
+                        seen[j] = flood_id
+                        stack.append(j)
+            if not left:
+                break
+        return pieces
+
+    def _forced_cells(self) -> List[Tuple[int, int]]:
         H, W = self.H, self.W
-        white_map = [[1] * W for _ in range(H)]
-        for r in range(H):
-            for c in range(W):
-                if self.state[r][c] == 0:
-                    white_map[r][c] = 0
-        return count_connected_components(white_map) <= self.max_components
-
-    def solve(self, need: int = 1):
-        def backtrack():
-            if need > 0 and len(self.solutions) >= need:
-                return
-
-            if not self.check_components():
-                return
-
-            pos = self.find_empty()
-            if not pos:
-                if self.valid_full():
-                    self.solutions.append(deepcopy(self.state))
-                return
-
-            r, c = pos
-            for val in self.allowed(r, c):
-                self.state[r][c] = val
-                if self.valid_partial(r, c):
-                    backtrack()
-                self.state[r][c] = None
-
-        backtrack()
+        values = self._values
+        lines = ([[r * W + c for c in range(W)] for r in range(H)]
+                 + [[r * W + c for r in range(H)] for c in range(W)])
+        forced = []
+        for line in lines:
+            # a b a: одна из крайних клеток черная, значит средняя белая
+            for a, b, c in zip(line, line[1:], line[2:]):
+                if values[a] == values[c]:
+                    forced.append((b, WHITE))
+            # a a: ровно одна из пары белая, значит остальные a в линии черные
+            for a, b in zip(line, line[1:]):
+                if values[a] == values[b]:
+                    forced.extend((k, BLACK) for k in line
+                                  if k != a and k != b and values[k] == values[a])
+        return forced
+
+    def solve_iter(self, need: int = 0,
+                   should_stop: Optional[Callable[[], bool]] = None) -> Iterator[List[List[Optional[int]]]]:
+        # need=0 - генератор выдает все решения, вызывающий сам решает, когда остановиться;
+        # solve() по умолчанию ищет одно решение, как и раньше
+        H, W = self.H, self.W
+        empties = list(self.empties)
+        where = [0] * (H * W)
+        for j, i in enumerate(empties):
+            where[i] = j
+        trail: List[Tuple[int, int]] = []
+        self.stats = {'nodes': 0, 'forced': 0}
+        open_map = [[1 if self._cells[r * W + c] == BLACK else 0 for c in range(W)] for r in range(H)]
+        components = count_connected_components(open_map)
+
+        # Неизменные для головоломки данные связываются с локальными именами один раз
+        cells = self._cells
+        rc = self._rc
+        degree = self._degree
+        nbrs = self._nbrs
+        row_same = self._row_same
+        col_same = self._col_same
+        can_be_black = self._can_be_black
+        can_be_white = self._can_be_white
+        domain = self._domain
+        mark = self._mark
+        split_pieces = self._split_pieces
+        max_components = self.max_components
+        stats = self.stats
+        n_empties = len(empties)
+        # Сколько раз клетка приводила к тупику: такие клетки выбираются раньше
+        fails = [0] * (H * W)
+
+        def assign(i: int, val: int) -> bool:
+            nonlocal components
+            queue = [(i, val)]
+            while queue:
+                i, val = queue.pop()
+                current = cells[i]
+                if current != UNASSIGNED:
+                    if current != val:
+                        return False
+                    continue
+                if not (can_be_black(i) if val == BLACK else can_be_white(i)):
+                    return False
+
+                k, j = len(trail), where[i]
+                empties[j], empties[k] = empties[k], i
+                where[empties[j]], where[i] = j, k
+                cells[i] = val
+                mark(i, val)
+                trail.append((i, val))
+
+                if val == BLACK:
+                    components += split_pieces(i) - 1
+                    if components > max_components:
+                        return False
+                    for j in nbrs[i]:
+                        if cells[j] == UNASSIGNED:
+                            queue.append((j, WHITE))
+                else:
+                    r, c = rc[i]
+                    mask = row_same[i] & ~(1 << c)
+                    while mask:
+                        bit = mask & -mask
+                        mask ^= bit
+                        queue.append((r * W + bit.bit_length() - 1, BLACK))
+                    mask = col_same[i] & ~(1 << r)
+                    while mask:
+                        bit = mask & -mask
+                        mask ^= bit
+                        queue.append(((bit.bit_length() - 1) * W + c, BLACK))
+            return True
+
+        def undo(depth: int):
+            while len(trail) > depth:
+                i, val = trail.pop()
+                mark(i, val)
+                cells[i] = UNASSIGNED
+
+        def select(i: int) -> int:
+            best, best_key, best_dom = i, None, 0
+            for j in range(i, n_empties):
+                cell = empties[j]
+                dom = domain(cell)
+                if not dom:
+                    fails[cell] += 1
+                    return 0
+                key = (DOMAIN_SIZE[dom], -fails[cell], -degree[cell])
+                if best_key is None or key < best_key:
+                    best, best_key, best_dom = j, key, dom
+            empties[i], empties[best] = empties[best], empties[i]
+            where[empties[i]], where[empties[best]] = i, best
+            return best_dom
+
+        # Стек вместо рекурсии: (глубина в trail, оставшиеся цвета клетки, компоненты до ветвления)
+        stack: List[Tuple[int, int, int]] = []
+        depth = None
+        found = 0
+        try:
+            # Выводы, верные для любого решения, назначаются до ветвления
+            if self._prefill_ok and components <= max_components:
+                if all(assign(cell, val) for cell, val in self._forced_cells()):
+                    stats['forced'] += len(trail)
+                    depth = len(trail)
+
+            while True:
+                if should_stop is not None and should_stop():
+                    break
+
+                if depth is not None:
+                    stats['nodes'] += 1
+                    if depth == n_empties:
+                        yield [list(cells[r * W:(r + 1) * W]) for r in range(H)]
+                        found += 1
+                        if need > 0 and found >= need:
+                            break
+                    else:
+                        dom = select(depth)
+                        if dom:
+                            stack.append((depth, dom, components))
+                    depth = None
+
+                if not stack:
+                    break
+
+                i, dom, before = stack[-1]
+                undo(i)
+                components = before
+                if not dom:
+                    stack.pop()
+                    continue
+
+                bit = dom & -dom
+                stack[-1] = (i, dom ^ bit, before)
+                if assign(empties[i], bit.bit_length() - 1):
+                    stats['forced'] += len(trail) - i - 1
+                    depth = len(trail)
+                else:
+                    fails[empties[i]] += 1
+        finally:
+            undo(0)
+
+    def solve(self, need: int = 1, should_stop: Optional[Callable[[], bool]] = None):
+        # Поиск детерминирован, поэтому повторный вызов пропускает уже записанные
+        # решения и дополняет список не более чем до need
+        found = len(self.solutions)
+        if need > 0 and found >= need:
+            return self.solutions
+        self.solutions.extend(itertools.islice(self.solve_iter(need, should_stop), found, None))
         return self.solutions
 
+    def _branch_states(self, depth: int) -> List[List[List[Optional[int]]]]:
+        # Один вспомогательный решатель: проверки работают с его state,
+        # который подменяется копией каждого префикса
+        branch = HitoriSolver(self.grid, max_components=self.max_components)
+        states = [[row[:] for row in self.state]]
+        for _ in range(depth):
+            expanded = []
+            for state in states:
+                branch.state = state
+                pos = branch.find_empty()
+                if pos is None:
+                    expanded.append(state)
+                    continue
+                r, c = pos
+                self.stats['nodes'] += 1
+                for val in branch.allowed(r, c):
+                    state[r][c] = val
+                    if branch.valid_partial(r, c):
+                        expanded.append([row[:] for row in state])
+                state[r][c] = None
+            states = expanded
+        return states
+
+    def solve_parallel(self, need: int = 1, jobs: Optional[int] = None):
+        jobs = jobs or multiprocessing.cpu_count()
+        if self.find_empty() is None:
+            return self.solve(need)
+
+        # Поддеревья для всех допустимых раскрасок первых log2(jobs) свободных клеток;
+        # узлы, раскрытые при их построении, входят в общую статистику
+        self.stats = {'nodes': 0, 'forced': 0}
+        depth = max(1, (jobs - 1).bit_length())
+        tasks = [(self.grid, state, self.max_components, need)
+                 for state in self._branch_states(depth)]
+
+        # Очередь задач дочитывается до конца: рабочие сами останавливаются по
+        # общему счетчику, а выход из with посреди выдачи задач может зависнуть
+        # в terminate()
+        found = multiprocessing.Value('i', 0)
+        with multiprocessing.Pool(jobs, initializer=_init_branch_worker, initargs=(found,)) as pool:
+            for solutions, stats in pool.imap_unordered(_solve_branch, tasks):
+                self.solutions.extend(solutions)
+                for name in self.stats:
+                    self.stats[name] += stats[name]
+            pool.close()
+            pool.join()
+
+        if need > 0:
+            del self.solutions[need:]
+        return self.solutions
+
+
+_found_solutions = None
+
+
+def _init_branch_worker(found):
+    global _found_solutions
+    _found_solutions = found
+
+
+def _solve_branch(task):
+    grid, state, max_components, need = task
+    solver = HitoriSolver(grid, state=state, max_components=max_components)
+    # Чтение без блокировки: проверка выполняется в каждом узле, а запаздывание
+    # на одно значение лишь немного откладывает остановку
+    counter = _found_solutions.get_obj()
+    should_stop = (lambda: counter.value >= need) if need > 0 else None
+    for solution in solver.solve_iter(need, should_stop):
+        solver.solutions.append(solution)
+        with _found_solutions.get_lock():
+            _found_solutions.value += 1
+    return solver.solutions, solver.stats
+
+
+def read_puzzle(path: str) -> Tuple[List[List[int]], Optional[int]]:
+    file_M = None
+    grid = []
+    with open(path, 'r') as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            if line.startswith('# M='):
+                try:
+                    file_M = int(line.split('=')[1])
+                except ValueError:
+                    pass
+            elif line and not line.startswith('#'):
+                try:
+                    grid.append(list(map(int, line.split())))
+                except ValueError as e:
+                    raise ValueError(f"Ошибка в строке {line_num}: {e}") from e
+    return grid, file_M
+
+
+def solution_stats(state: List[List[Optional[int]]]) -> Tuple[int, int, int]:
+    white_count = sum(row.count(WHITE) for row in state)
+    black_count = sum(row.count(BLACK) for row in state)
+    # В готовом решении state уже является картой белых клеток (0 - белая)
+    return white_count, black_count, count_connected_components(state)
+
 
 def display_grid(grid: List[List[int]], state=None):
     H = len(grid)
@@ -170,7 +571,7 @@ def display_grid(grid: List[List[int]], state=None):
     for r in range(H):
         row_str = []
         for c in range(W):
-            if state and state[r][c] == 1:
+            if state and state[r][c] == BLACK:
                 row_str.append('██')
             else:
                 row_str.append(f"{grid[r][c]:2d}")
@@ -181,20 +582,8 @@ def display_solution(grid, state, idx=1, max_components=1):
     print(f"\n--- Решение {idx} ---")
     display_grid(grid, state)
 
-    H = len(grid)
-    W = len(grid[0])
-    white_count = sum(1 for r in range(H) for c in range(W) if state[r][c] == 0)
-    black_count = sum(1 for r in range(H) for c in range(W) if state[r][c] == 1)
-
+    white_count, black_count, components = solution_stats(state)
     print(f"Белых клеток: {white_count}, Черных клеток: {black_count}")
-
-    white_map = [[1] * W for _ in range(H)]
-    for r in range(H):
-        for c in range(W):
-            if state[r][c] == 0:
-                white_map[r][c] = 0
-
-    components = count_connected_components(white_map)
     print(f"Компонент связности белых клеток: {components}")
 
     if components > max_components:
@@ -212,6 +601,8 @@ def main():
     parser.add_argument("--all", action="store_true")
     parser.add_argument("--find", type=int, default=None)
     parser.add_argument("--M", type=int, default=1)
+    parser.add_argument("--stats", action="store_true")
+    parser.add_argument("--jobs", type=int, default=1)
 
     args = parser.parse_args()
 
@@ -219,6 +610,10 @@ def main():
         print("Ошибка: --M должно быть неотрицательным")
         return
 
+    if args.jobs < 1:
+        print("Ошибка: --jobs должно быть положительным")
+        return
+
     if args.all:
         need = 0
     elif args.find is not None:
@@ -230,31 +625,17 @@ def main():
         need = 1
 
     try:
-        file_M = None
-        with open(args.file, 'r') as f:
-            grid = []
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if line.startswith('# M='):
-                    try:
-                        file_M = int(line.split('=')[1])
-                    except:
-                        pass
-                elif line and not line.startswith('#'):
-                    try:
-                        row = list(map(int, line.split()))
-                        grid.append(row)
-                    except ValueError as e:
-                        print(f"Ошибка в строке {line_num}: {e}")
-                        return
-
-        if file_M is not None:
-            print(f"Найдено M={file_M} в файле")
-            args.M = file_M
-
+        grid, file_M = read_puzzle(args.file)
     except FileNotFoundError:
         print(f"Файл '{args.file}' не найден")
         return
+    except ValueError as e:
+        print(e)
+        return
+
+    if file_M is not None:
+        print(f"Найдено M={file_M} в файле")
+        args.M = file_M
 
     is_valid, message = validate_grid(grid)
     if not is_valid:
@@ -271,7 +652,14 @@ def main():
     solver = HitoriSolver(grid, max_components=args.M)
 
     print("\nПоиск решений...")
-    solutions = solver.solve(need)
+    if args.jobs > 1:
+        solutions = solver.solve_parallel(need, jobs=args.jobs)
+    else:
+        solutions = solver.solve(need)
+
+    if args.stats:
+        print(f"Узлов поиска: {solver.stats['nodes']}, "
+              f"вынужденных назначений: {solver.stats['forced']}")
 
     if not solutions:
         print("\nРешений нет")
@@ -2,11 +2,15 @@
 import pytest
 import tempfile
 import os
+import itertools
 from solver import (
     neighbors_orth,
     count_connected_components,
     validate_grid,
     HitoriSolver,
+    read_puzzle,
+    solution_stats,
+    UNASSIGNED,
 )
 
 
@@ -240,6 +244,238 @@ def test_limit_number_of_solutions():
     solutions_all = solver2.solve(0)  # 0 = все решения
     assert len(solutions_all) >= len(solutions_one), "Всех решений должно быть не меньше"
 
+    # Повторный вызов на том же решателе не превышает лимит
+    assert len(solver.solve(1)) == 1, "Повторный solve(1) должен вернуть одно решение"
+    assert solver2.solve(1) == solutions_all, "Найденные решения не должны дублироваться"
+
+    # Повторный вызов с большим лимитом дополняет список новыми решениями
+    solver3 = HitoriSolver(grid)
+    first = solver3.solve(1)[:]
+    more = solver3.solve(2)
+    assert more[:1] == first and more == solutions_all[:2], "solve(2) должен продолжить solve(1)"
+    assert solver3.solve(0) == solutions_all, "solve(0) должен дополнить список до всех решений"
+
+
+# ------------------------------------------------------------
+# ТЕСТ 11: Статистика решения
+# ------------------------------------------------------------
+def test_solution_stats():
+    """Проверка подсчета белых/черных клеток и компонент решения."""
+    state = [
+        [0, 1, 0],
+        [0, 0, 0],
+        [1, 0, 1]
+    ]
+    assert solution_stats(state) == (6, 3, 1), "Неверная статистика решения"
+
+    split = [
+        [0, 1, 0],
+        [1, 0, 1],
+        [0, 1, 0]
+    ]
+    assert solution_stats(split) == (5, 4, 5), "Изолированные белые клетки - отдельные компоненты"
+
+
+# ------------------------------------------------------------
+# ТЕСТ 12: Потоковая выдача решений
+# ------------------------------------------------------------
+def test_solve_iter_streams_solutions():
+    """Проверка генератора решений и восстановления состояния после остановки."""
+    grid = [
+        [1, 2, 3],
+        [4, 5, 6],
+        [7, 8, 9]
+    ]
+
+    all_solutions = HitoriSolver(grid).solve(0)
+
+    solver = HitoriSolver(grid)
+    solutions = solver.solve_iter()
+    first = next(solutions)
+    assert first == all_solutions[0], "Генератор должен выдавать решения в том же порядке"
+    solutions.close()
+
+    # После досрочной остановки состояние должно быть восстановлено
+    assert all(cell == UNASSIGNED for cell in solver._cells), "Состояние не восстановлено"
+    assert list(solver.solve_iter(3)) == all_solutions[:3], "Лимит решений не соблюден"
+
+
+# ------------------------------------------------------------
+# ТЕСТ 13: Остановка поиска
+# ------------------------------------------------------------
+def test_should_stop_cancels_search():
+    """Проверка кооперативной отмены поиска."""
+    grid = [
+        [1, 2, 3],
+        [4, 5, 6],
+        [7, 8, 9]
+    ]
+
+    solver = HitoriSolver(grid)
+    assert solver.solve(0, should_stop=lambda: True) == [], "Отмененный поиск не должен находить решений"
+
+    # Останавливаемся, как только появилось первое решение
+    stop = []
+    solutions = []
+    for solution in HitoriSolver(grid).solve_iter(0, should_stop=lambda: bool(stop)):
+        solutions.append(solution)
+        stop.append(True)
+    total = len(HitoriSolver(grid).solve(0))
+    assert 1 == len(solutions) < total, "Должны вернуться частичные результаты"
+
+
+# ------------------------------------------------------------
+# ТЕСТ 14: Параллельный поиск
+# ------------------------------------------------------------
+def test_parallel_matches_serial():
+    """Параллельный поиск должен находить те же решения, что и обычный."""
+    grid = [
+        [1, 1, 2],
+        [3, 2, 3],
+        [2, 3, 1]
+    ]
+
+    serial = HitoriSolver(grid, max_components=2).solve(0)
+    parallel = HitoriSolver(grid, max_components=2).solve_parallel(0, jobs=2)
+    assert sorted(parallel) == sorted(serial), "Наборы решений должны совпадать"
+
+    limited = HitoriSolver(grid, max_components=2).solve_parallel(1, jobs=2)
+    assert len(limited) == 1 and limited[0] in serial, "Лимит решений не соблюден"
+
+
+# ------------------------------------------------------------
+# ТЕСТ 15: Общий разбор файла головоломки
+# ------------------------------------------------------------
+def test_read_puzzle():
+    """Проверка разбора файла, общего для CLI и GUI."""
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+        f.write("# M=2\n# комментарий\n1 1 2\n\n3 2 3\n2 3 1\n")
+        filename = f.name
+
+    try:
+        grid, file_M = read_puzzle(filename)
+        assert grid == [[1, 1, 2], [3, 2, 3], [2, 3, 1]], "Неверное чтение сетки"
+        assert file_M == 2, "Значение M из файла не прочитано"
+
+        with open(filename, 'w') as f:
+            f.write("1 2\n2 x\n")
+        with pytest.raises(ValueError, match="строке 2"):
+            read_puzzle(filename)
+    finally:
+        os.unlink(filename)
+
+
+# ------------------------------------------------------------
+# ТЕСТ 16: Некорректное начальное состояние
+# ------------------------------------------------------------
+def test_invalid_prefilled_state():
+    """Заданные клетки, нарушающие правила, не дают решений."""
+    grid = [
+        [1, 2, 3],
+        [4, 5, 6],
+        [7, 8, 9]
+    ]
+
+    # Две соседние черные клетки
+    state = [[1, 1, None], [None, None, None], [None, None, None]]
+    assert HitoriSolver(grid, state=state).solve(0) == [], "Соседние черные клетки недопустимы"
+
+    # Две белые клетки с одинаковым значением в строке
+    grid_dup = [
+        [1, 2, 1],
+        [3, 4, 5],
+        [6, 7, 8]
+    ]
+    state = [[0, None, 0], [None, None, None], [None, None, None]]
+    assert HitoriSolver(grid_dup, state=state).solve(0) == [], "Повтор белых значений недопустим"
+
+    # Корректное начальное состояние сохраняется во всех решениях
+    state = [[1, None, None], [None, None, None], [None, None, None]]
+    solutions = HitoriSolver(grid, state=state).solve(0)
+    assert solutions and all(sol[0][0] == 1 for sol in solutions), "Заданная клетка должна сохраниться"
+
+
+# ------------------------------------------------------------
+# ТЕСТ 17: Выводы до ветвления (a b a и a a)
+# ------------------------------------------------------------
+def brute_force_solutions(grid, max_components=1):
+    """Полный перебор раскрасок без распространения ограничений."""
+    H, W = len(grid), len(grid[0])
+    lines = [[(r, c) for c in range(W)] for r in range(H)] + [[(r, c) for r in range(H)] for c in range(W)]
+    solutions = []
+    for cells in itertools.product((0, 1), repeat=H * W):
+        state = [list(cells[r * W:(r + 1) * W]) for r in range(H)]
+        ok = True
+        for line in lines:
+            colors = [state[r][c] for r, c in line]
+            whites = [grid[r][c] for r, c in line if state[r][c] == 0]
+            if len(whites) != len(set(whites)) or any(a == b == 1 for a, b in zip(colors, colors[1:])):
+                ok = False
+                break
+        if ok and count_connected_components(state) <= max_components:
+            solutions.append(state)
+    return solutions
+
+
+def test_forced_cells():
+    """Вынужденные клетки должны быть верны для всех решений."""
+    grid = [
+        [1, 2, 1, 3],
+        [3, 3, 4, 3],
+        [2, 4, 3, 1],
+        [4, 1, 2, 3]
+    ]
+
+    solver = HitoriSolver(grid)
+    forced = solver._forced_cells()
+    # 1 2 1 в строке 0, пара 3 3 в строке 1, пара и 3 1 3 в столбце 3
+    assert (1, 0) in forced and (7, 1) in forced and (11, 0) in forced and (15, 1) in forced
+
+    solutions = solver.solve(0)
+    assert sorted(solutions) == sorted(brute_force_solutions(grid)), "Выводы не должны терять решения"
+    assert solutions, "У сетки есть решения"
+    for i, val in forced:
+        r, c = divmod(i, 4)
+        assert all(sol[r][c] == val for sol in solutions), f"Клетка ({r},{c}) должна быть {val}"
+
+    # 1 1 1 1: пара в начале требует двух соседних черных клеток в конце
+    grid = [
+        [1, 1, 1, 1],
+        [2, 3, 4, 5],
+        [3, 4, 5, 6],
+        [4, 5, 6, 7]
+    ]
+    solver = HitoriSolver(grid)
+    assert solver.solve(0) == [] == brute_force_solutions(grid), "Противоречие должно давать 0 решений"
+    assert solver.stats['nodes'] == 0, "Противоречие должно обнаруживаться до ветвления"
+
+
+# ------------------------------------------------------------
+# ТЕСТ 18: Проверка состояния, измененного вручную
+# ------------------------------------------------------------
+def test_valid_partial_checks_whole_line():
+    """valid_partial проверяет всю строку и столбец, а не только значение клетки."""
+    grid = [
+        [2, 3, 2, 3, 4],
+        [1, 2, 3, 4, 5],
+        [3, 4, 5, 1, 2],
+        [4, 5, 1, 2, 3],
+        [5, 1, 4, 2, 1]
+    ]
+    solver = HitoriSolver(grid)
+    solver.state[0] = [0, 0, 1, 0, None]
+    # Две белые тройки в строке 0 при проверке клетки (0, 0) со значением 2
+    assert not solver.valid_partial(0, 0), "Повтор белых значений в строке должен обнаруживаться"
+
+    solver.state[0] = [0, 0, 1, 1, None]
+    assert solver.valid_partial(0, 0), "Строка без повторов корректна"
+
+    # Две белые двойки в столбце 3 при проверке клетки (1, 3) со значением 4
+    solver.state[1][3] = 0
+    solver.state[3][3] = 0
+    solver.state[4][3] = 0
+    assert not solver.valid_partial(1, 3), "Повтор белых значений в столбце должен обнаруживаться"
+
 
 # ------------------------------------------------------------
 # БОНУС ТЕСТ: Проверка минимального размера (если нужно)